@@ -3,15 +3,20 @@ LangGraph Agent for Code Analysis
 Implements multi-step reasoning flow for code understanding and review
 """
 
+import asyncio
 import os
-from typing import TypedDict, Annotated, List, Dict, Any
+import re
+from functools import lru_cache
+from typing import TypedDict, Annotated, AsyncIterator, List, Dict, Any, Optional
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 from langchain_core.tools import tool
 import operator
+from pydantic import BaseModel, Field
 
 from mcp_servers.filesystem_server import FileSystemMCP
 from mcp_servers.github_server import GitHubMCP
@@ -19,233 +24,345 @@ from mcp_servers.code_analyzer import CodeAnalyzerMCP
 
 
 class AgentState(TypedDict):
-    """State for the agent graph"""
+    """State for the agent graph
+
+    Nodes return only the keys they change; the messages reducer appends
+    each node's new messages instead of re-adding the whole history.
+    """
     messages: Annotated[List, operator.add]
     repo_path: str
     github_url: str
     current_step: str
     analysis_results: Dict[str, Any]
     user_query: str
+    fs_mcp: Optional[FileSystemMCP]
+
+
+class SearchPlan(BaseModel):
+    """Structured query understanding and search plan returned by the LLM"""
+    intent: str = Field(
+        description="Type of request: explanation, bug finding, review, documentation or refactoring"
+    )
+    keywords: List[str] = Field(
+        default_factory=list,
+        description="Up to 4 short identifiers or terms to grep for in the source code"
+    )
+    patterns: List[str] = Field(
+        default_factory=list,
+        description="Up to 5 filename glob patterns likely to contain relevant code, e.g. *auth*.py"
+    )
+    file_types: List[str] = Field(
+        default_factory=list,
+        description="File extensions worth analyzing, e.g. .py"
+    )
+
+
+# Query understanding and search planning share one LLM round-trip
+SEARCH_PLAN_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are a code analysis expert. Analyze the user's query and determine:
+1. What type of request is this? (explanation, bug finding, review, documentation, refactoring)
+2. Which keywords should be searched for in the code?
+3. Which filename patterns and file types are most relevant?
+
+Leave keywords and patterns empty if the query is about the codebase as a whole."""),
+    ("human", "{query}")
+])
+
+# Query keywords that select a fallback search category
+QUERY_CATEGORIES = {
+    'auth': 'auth',
+    'login': 'auth',
+    'database': 'database',
+    'sql': 'database',
+    'api': 'api',
+    'endpoint': 'api',
+    'bug': 'bug',
+    'error': 'bug',
+}
+
+# All category keywords in one alternation, so a query is scanned once
+QUERY_KEYWORD_RE = re.compile('|'.join(re.escape(keyword) for keyword in QUERY_CATEGORIES))
+
+# Fallback search plans per category, in priority order
+CATEGORY_SEARCH_PLANS = (
+    ('auth', {
+        'patterns': ('*auth*.py', '*login*.py'),
+        'keywords': ('auth', 'login', 'password', 'token'),
+        'file_types': ()
+    }),
+    ('database', {
+        'patterns': ('*db*.py', '*model*.py'),
+        'keywords': ('db', 'database', 'query', 'sql'),
+        'file_types': ()
+    }),
+    ('api', {
+        'patterns': ('*api*.py', '*route*.py', '*views*.py'),
+        'keywords': ('api', 'route', 'endpoint', '@app'),
+        'file_types': ()
+    }),
+    ('bug', {
+        'patterns': (),
+        'keywords': ('error', 'exception', 'try', 'except'),
+        'file_types': ('.py', '.js')
+    }),
+)
+
+# General search when no category keyword matches
+GENERAL_SEARCH_PLAN = {
+    'patterns': ('*.py', '*.js'),
+    'keywords': (),
+    'file_types': ()
+}
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """Return the process-wide LLM client for the configured provider"""
+    provider = os.getenv('LLM_PROVIDER', 'openai')
+    if provider == 'anthropic':
+        return ChatAnthropic(
+            model=os.getenv('LLM_MODEL', 'claude-3-sonnet-20240229'),
+            temperature=0.1
+        )
+    elif provider == 'openrouter':
+        # OpenRouter configuration
+        return ChatOpenAI(
+            model=os.getenv('LLM_MODEL', 'openai/gpt-4-turbo-preview'),
+            openai_api_key=os.getenv('OPENROUTER_API_KEY'),
+            openai_api_base='https://openrouter.ai/api/v1',
+            temperature=0.1,
+            model_kwargs={
+                'extra_headers': {
+                    'HTTP-Referer': 'https://code-assistant.app',
+                    'X-Title': 'Code Assistant AI'
+                }
+            }
+        )
+    else:
+        return ChatOpenAI(
+            model=os.getenv('LLM_MODEL', 'gpt-4-turbo-preview'),
+            temperature=0.1
+        )
 
 
-class CodeAssistantAgent:
-    """LangGraph-based agent for code analysis and assistance"""
+@lru_cache(maxsize=None)
+def get_planner():
+    """Return the structured-output chain used by understand_query"""
+    return SEARCH_PLAN_PROMPT | get_llm().with_structured_output(SearchPlan)
 
-    def __init__(self, repo_path: str = None, github_url: str = None):
-        self.repo_path = repo_path
-        self.github_url = github_url
 
-        # Initialize MCP servers
-        self.fs_mcp = FileSystemMCP(repo_path) if repo_path else None
-        self.github_mcp = GitHubMCP()
-        self.analyzer_mcp = CodeAnalyzerMCP()
-
-        # Initialize LLM
-        provider = os.getenv('LLM_PROVIDER', 'openai')
-        if provider == 'anthropic':
-            self.llm = ChatAnthropic(
-                model=os.getenv('LLM_MODEL', 'claude-3-sonnet-20240229'),
-                temperature=0.1
-            )
-        elif provider == 'openrouter':
-            # OpenRouter configuration
-            self.llm = ChatOpenAI(
-                model=os.getenv('LLM_MODEL', 'openai/gpt-4-turbo-preview'),
-                openai_api_key=os.getenv('OPENROUTER_API_KEY'),
-                openai_api_base='https://openrouter.ai/api/v1',
-                temperature=0.1,
-                model_kwargs={
-                    'extra_headers': {
-                        'HTTP-Referer': 'https://code-assistant.app',
-                        'X-Title': 'Code Assistant AI'
-                    }
-                }
-            )
-        else:
-            self.llm = ChatOpenAI(
-                model=os.getenv('LLM_MODEL', 'gpt-4-turbo-preview'),
-                temperature=0.1
-            )
-
-        # Build the graph
-        self.graph = self._build_graph()
-
-    def _build_graph(self) -> StateGraph:
-        """Build the LangGraph workflow"""
-        workflow = StateGraph(AgentState)
-
-        # Add nodes
-        workflow.add_node("understand_query", self.understand_query)
-        workflow.add_node("plan_search", self.plan_search)
-        workflow.add_node("execute_search", self.execute_search)
-        workflow.add_node("analyze_code", self.analyze_code)
-        workflow.add_node("generate_response", self.generate_response)
-
-        # Add edges
-        workflow.set_entry_point("understand_query")
-        workflow.add_edge("understand_query", "plan_search")
-        workflow.add_edge("plan_search", "execute_search")
-        workflow.add_edge("execute_search", "analyze_code")
-        workflow.add_edge("analyze_code", "generate_response")
-        workflow.add_edge("generate_response", END)
-
-        return workflow.compile()
-
-    def understand_query(self, state: AgentState) -> AgentState:
-        """Step 1: Understand the user's query and intent"""
-        user_query = state['user_query']
-
-        system_prompt = """You are a code analysis expert. Analyze the user's query and determine:
-1. What type of request is this? (explanation, bug finding, review, documentation, refactoring)
-2. What specific files or patterns should be searched?
-3. What depth of analysis is needed?
+@lru_cache(maxsize=None)
+def get_github_mcp() -> GitHubMCP:
+    """Return the shared GitHub MCP server"""
+    return GitHubMCP()
+
+
+@lru_cache(maxsize=None)
+def get_analyzer_mcp() -> CodeAnalyzerMCP:
+    """Return the shared code analyzer MCP server"""
+    return CodeAnalyzerMCP()
+
 
-Respond in JSON format with: {"intent": "...", "scope": "...", "depth": "..."}"""
+@lru_cache(maxsize=None)
+def get_graph():
+    """Build and compile the LangGraph workflow once per process"""
+    workflow = StateGraph(AgentState)
 
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_query)
-        ]
+    # Add nodes
+    workflow.add_node("understand_query", understand_query)
+    workflow.add_node("plan_search", plan_search)
+    workflow.add_node("execute_search", execute_search)
+    workflow.add_node("analyze_code", analyze_code)
+    workflow.add_node("generate_response", generate_response)
 
-        response = self.llm.invoke(messages)
+    # Add edges
+    workflow.set_entry_point("understand_query")
+    workflow.add_edge("understand_query", "plan_search")
+    workflow.add_edge("plan_search", "execute_search")
+    workflow.add_edge("execute_search", "analyze_code")
+    workflow.add_edge("analyze_code", "generate_response")
+    workflow.add_edge("generate_response", END)
 
-        state['current_step'] = "Understanding query"
-        state['messages'].append(AIMessage(content=f"🔍 Analyzing your question: {user_query}"))
+    return workflow.compile()
 
-        return state
 
-    def plan_search(self, state: AgentState) -> AgentState:
-        """Step 2: Plan which files and patterns to search"""
-        user_query = state['user_query']
+async def understand_query(state: AgentState) -> Dict[str, Any]:
+    """Step 1: Understand the user's query and plan the search in one LLM call"""
+    user_query = state['user_query']
 
-        # Determine search strategy based on query
-        search_plan = {
-            'patterns': [],
-            'keywords': [],
-            'file_types': []
+    try:
+        plan = await get_planner().ainvoke({'query': user_query})
+        analysis_results = {
+            'intent': plan.intent,
+            'search_plan': {
+                'patterns': plan.patterns,
+                'keywords': plan.keywords,
+                'file_types': plan.file_types
+            }
         }
+    except Exception:
+        # Providers without structured output support fall back to
+        # the keyword rules in plan_search
+        analysis_results = {}
+
+    return {
+        'analysis_results': analysis_results,
+        'current_step': "Understanding query",
+        'messages': [AIMessage(content=f"🔍 Analyzing your question: {user_query}")]
+    }
+
+
+async def plan_search(state: AgentState) -> Dict[str, Any]:
+    """Step 2: Plan which files and patterns to search"""
+    search_plan = state['analysis_results'].get('search_plan')
+
+    if not search_plan or not (search_plan['patterns'] or search_plan['keywords']):
+        search_plan = _keyword_search_plan(state['user_query'])
+
+    return {
+        'analysis_results': {**state['analysis_results'], 'search_plan': search_plan},
+        'current_step': "Planning search",
+        'messages': [AIMessage(content=f"📋 Planning to search: {', '.join(search_plan['patterns'][:3])}")]
+    }
+
+
+def _keyword_search_plan(user_query: str) -> Dict[str, List[str]]:
+    """Build a search plan from keywords in the query"""
+    # Extract keywords from query
+    categories = {QUERY_CATEGORIES[keyword] for keyword in QUERY_KEYWORD_RE.findall(user_query.lower())}
+
+    # Determine search strategy based on query
+    search_plan = next(
+        (plan for category, plan in CATEGORY_SEARCH_PLANS if category in categories),
+        GENERAL_SEARCH_PLAN
+    )
+
+    # Copy so callers never mutate the shared table
+    return {key: list(values) for key, values in search_plan.items()}
+
+
+async def execute_search(state: AgentState) -> Dict[str, Any]:
+    """Step 3: Execute the search across codebase"""
+    search_plan = state['analysis_results']['search_plan']
+    results = {
+        'files': [],
+        'matches': []
+    }
+
+    fs_mcp = state['fs_mcp']
+    github_url = state['github_url']
+
+    if fs_mcp:
+        # File listings and keyword searches are independent, so run
+        # them concurrently in worker threads
+        file_lists, match_lists = await asyncio.gather(
+            asyncio.gather(*[
+                asyncio.to_thread(fs_mcp.list_files, pattern)
+                for pattern in search_plan['patterns'][:5]  # Limit patterns
+            ]),
+            asyncio.gather(*[
+                asyncio.to_thread(fs_mcp.search_in_files, keyword, '*.py')
+                for keyword in search_plan['keywords'][:3]
+            ])
+        )
 
-        # Extract keywords from query
-        if 'authentication' in user_query.lower() or 'auth' in user_query.lower():
-            search_plan['keywords'] = ['auth', 'login', 'password', 'token']
-            search_plan['patterns'] = ['*auth*.py', '*login*.py']
+        for files in file_lists:
+            results['files'].extend(files[:10])  # Limit results
+
+        for matches in match_lists:
+            results['matches'].extend(matches[:20])
+
+        # Get file structure
+        if not results['files']:
+            results['structure'] = await asyncio.to_thread(fs_mcp.get_file_structure)
+
+    elif github_url:
+        # Search GitHub repo
+        github_mcp = get_github_mcp()
+        repo_info, *match_lists = await asyncio.gather(
+            asyncio.to_thread(github_mcp.get_repo_info, github_url),
+            *[
+                asyncio.to_thread(github_mcp.search_code, keyword, github_url)
+                for keyword in search_plan['keywords'][:3]
+            ]
+        )
+        results['repo_info'] = repo_info
 
-        elif 'database' in user_query.lower() or 'sql' in user_query.lower():
-            search_plan['keywords'] = ['db', 'database', 'query', 'sql']
-            search_plan['patterns'] = ['*db*.py', '*model*.py']
+        for matches in match_lists:
+            results['matches'].extend(matches)
 
-        elif 'api' in user_query.lower() or 'endpoint' in user_query.lower():
-            search_plan['keywords'] = ['api', 'route', 'endpoint', '@app']
-            search_plan['patterns'] = ['*api*.py', '*route*.py', '*views*.py']
+    files_found = len(results['files'])
+    matches_found = len(results['matches'])
 
-        elif 'bug' in user_query.lower() or 'error' in user_query.lower():
-            search_plan['keywords'] = ['error', 'exception', 'try', 'except']
-            search_plan['file_types'] = ['.py', '.js']
+    return {
+        'analysis_results': {**state['analysis_results'], 'search_results': results},
+        'current_step': "Executing search",
+        'messages': [AIMessage(content=f"📁 Found {files_found} files, {matches_found} code matches")]
+    }
 
-        else:
-            # General search
-            search_plan['patterns'] = ['*.py', '*.js']
 
-        state['analysis_results'] = {'search_plan': search_plan}
-        state['current_step'] = "Planning search"
-        state['messages'].append(
-            AIMessage(content=f"📋 Planning to search: {', '.join(search_plan['patterns'][:3])}")
-        )
+async def analyze_code(state: AgentState) -> Dict[str, Any]:
+    """Step 4: Analyze found code for insights"""
+    search_results = state['analysis_results']['search_results']
+    analysis = {
+        'file_analyses': [],
+        'issues': [],
+        'suggestions': []
+    }
 
-        return state
+    # Analyze top files concurrently; each file is read and analyzed in a worker thread
+    fs_mcp = state['fs_mcp']
 
-    def execute_search(self, state: AgentState) -> AgentState:
-        """Step 3: Execute the search across codebase"""
-        search_plan = state['analysis_results']['search_plan']
-        results = {
-            'files': [],
-            'matches': []
-        }
+    if fs_mcp:
+        file_results = await asyncio.gather(*[
+            asyncio.to_thread(_analyze_file, fs_mcp, file_info['path'])
+            for file_info in search_results.get('files', [])[:5]
+        ])
 
-        if self.fs_mcp:
-            # Search files
-            for pattern in search_plan['patterns'][:5]:  # Limit patterns
-                files = self.fs_mcp.list_files(pattern)
-                results['files'].extend(files[:10])  # Limit results
-
-            # Search for keywords
-            for keyword in search_plan['keywords'][:3]:
-                matches = self.fs_mcp.search_in_files(keyword, '*.py')
-                results['matches'].extend(matches[:20])
-
-            # Get file structure
-            if not results['files']:
-                results['structure'] = self.fs_mcp.get_file_structure()
-
-        elif self.github_url:
-            # Search GitHub repo
-            repo_info = self.github_mcp.get_repo_info(self.github_url)
-            results['repo_info'] = repo_info
-
-            for keyword in search_plan['keywords'][:3]:
-                matches = self.github_mcp.search_code(keyword, self.github_url)
-                results['matches'].extend(matches)
-
-        state['analysis_results']['search_results'] = results
-        state['current_step'] = "Executing search"
-
-        files_found = len(results['files'])
-        matches_found = len(results['matches'])
-        state['messages'].append(
-            AIMessage(content=f"📁 Found {files_found} files, {matches_found} code matches")
-        )
+        for file_analysis in file_results:
+            if file_analysis is None:
+                continue
 
-        return state
+            analysis['file_analyses'].append(file_analysis)
 
-    def analyze_code(self, state: AgentState) -> AgentState:
-        """Step 4: Analyze found code for insights"""
-        search_results = state['analysis_results']['search_results']
-        analysis = {
-            'file_analyses': [],
-            'issues': [],
-            'suggestions': []
-        }
+            # Collect issues
+            if 'issues' in file_analysis:
+                analysis['issues'].extend(file_analysis['issues'])
 
-        # Analyze top files
-        if self.fs_mcp:
-            for file_info in search_results.get('files', [])[:5]:
-                file_data = self.fs_mcp.read_file(file_info['path'])
-
-                if 'content' in file_data and file_info['path'].endswith('.py'):
-                    # Analyze Python file
-                    file_analysis = self.analyzer_mcp.analyze_python_file(
-                        file_data['content'],
-                        file_info['path']
-                    )
-                    analysis['file_analyses'].append(file_analysis)
-
-                    # Collect issues
-                    if 'issues' in file_analysis:
-                        analysis['issues'].extend(file_analysis['issues'])
-
-                    # Get suggestions
-                    suggestions = self.analyzer_mcp.suggest_improvements(file_analysis)
-                    analysis['suggestions'].extend(suggestions)
-
-        state['analysis_results']['code_analysis'] = analysis
-        state['current_step'] = "Analyzing code"
-
-        issues_count = len(analysis['issues'])
-        state['messages'].append(
-            AIMessage(content=f"🔬 Analysis complete. Found {issues_count} potential issues")
-        )
+            # Get suggestions
+            suggestions = get_analyzer_mcp().suggest_improvements(file_analysis)
+            analysis['suggestions'].extend(suggestions)
+
+    issues_count = len(analysis['issues'])
+
+    return {
+        'analysis_results': {**state['analysis_results'], 'code_analysis': analysis},
+        'current_step': "Analyzing code",
+        'messages': [AIMessage(content=f"🔬 Analysis complete. Found {issues_count} potential issues")]
+    }
+
+
+def _analyze_file(fs_mcp: FileSystemMCP, file_path: str) -> Optional[Dict[str, Any]]:
+    """Read and analyze a single Python file, or return None if it can't be analyzed"""
+    if not file_path.endswith('.py'):
+        return None
 
-        return state
+    file_data = fs_mcp.read_file(file_path)
+    if 'content' not in file_data:
+        return None
 
-    def generate_response(self, state: AgentState) -> AgentState:
-        """Step 5: Generate comprehensive response"""
-        user_query = state['user_query']
-        analysis = state['analysis_results']
+    return get_analyzer_mcp().analyze_python_file(file_data['content'], file_path)
 
-        # Prepare context for LLM
-        context = self._prepare_context(analysis)
 
-        system_prompt = """You are an expert code reviewer and assistant. Based on the analysis results,
+async def generate_response(state: AgentState) -> Dict[str, Any]:
+    """Step 5: Generate comprehensive response"""
+    user_query = state['user_query']
+    analysis = state['analysis_results']
+
+    # Prepare context for LLM
+    context = _prepare_context(analysis)
+
+    system_prompt = """You are an expert code reviewer and assistant. Based on the analysis results,
 provide a clear, helpful response to the user's query. Include:
 1. Direct answer to their question
 2. Relevant code snippets with file locations
@@ -254,72 +371,97 @@ provide a clear, helpful response to the user's query. Include:
 
 Format your response with proper markdown, code blocks, and clear sections."""
 
-        messages = [
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=f"User Query: {user_query}\n\nAnalysis Results:\n{context}")
-        ]
+    messages = [
+        SystemMessage(content=system_prompt),
+        HumanMessage(content=f"User Query: {user_query}\n\nAnalysis Results:\n{context}")
+    ]
 
-        response = self.llm.invoke(messages)
+    response = await get_llm().ainvoke(messages)
 
-        state['current_step'] = "Response generated"
-        state['messages'].append(AIMessage(content=response.content))
+    return {
+        'current_step': "Response generated",
+        'messages': [AIMessage(content=response.content)]
+    }
 
-        return state
 
-    def _prepare_context(self, analysis: Dict[str, Any]) -> str:
-        """Prepare analysis results as context for LLM"""
-        context_parts = []
+def _prepare_context(analysis: Dict[str, Any]) -> str:
+    """Prepare analysis results as context for LLM"""
+    context_parts = []
 
-        # Add search results
-        if 'search_results' in analysis:
-            results = analysis['search_results']
-            context_parts.append(f"Files found: {len(results.get('files', []))}")
-            context_parts.append(f"Code matches: {len(results.get('matches', []))}")
+    # Add search results
+    if 'search_results' in analysis:
+        results = analysis['search_results']
+        context_parts.append(f"Files found: {len(results.get('files', []))}")
+        context_parts.append(f"Code matches: {len(results.get('matches', []))}")
 
-            # Add file names
-            if results.get('files'):
-                file_list = [f['path'] for f in results['files'][:10]]
-                context_parts.append(f"Relevant files: {', '.join(file_list)}")
+        # Add file names
+        if results.get('files'):
+            file_list = [f['path'] for f in results['files'][:10]]
+            context_parts.append(f"Relevant files: {', '.join(file_list)}")
 
-        # Add code analysis
-        if 'code_analysis' in analysis:
-            code_analysis = analysis['code_analysis']
+    # Add code analysis
+    if 'code_analysis' in analysis:
+        code_analysis = analysis['code_analysis']
 
-            # Add issues
-            if code_analysis.get('issues'):
-                issues_summary = {}
-                for issue in code_analysis['issues']:
-                    severity = issue.get('severity', 'unknown')
-                    issues_summary[severity] = issues_summary.get(severity, 0) + 1
+        # Add issues
+        if code_analysis.get('issues'):
+            issues_summary = {}
+            for issue in code_analysis['issues']:
+                severity = issue.get('severity', 'unknown')
+                issues_summary[severity] = issues_summary.get(severity, 0) + 1
 
-                context_parts.append(f"Issues by severity: {issues_summary}")
+            context_parts.append(f"Issues by severity: {issues_summary}")
 
-            # Add suggestions
-            if code_analysis.get('suggestions'):
-                context_parts.append("Suggestions:")
-                context_parts.extend(code_analysis['suggestions'][:5])
+        # Add suggestions
+        if code_analysis.get('suggestions'):
+            context_parts.append("Suggestions:")
+            context_parts.extend(code_analysis['suggestions'][:5])
 
-        return '\n'.join(context_parts)
+    return '\n'.join(context_parts)
 
-    def run(self, user_query: str) -> List[Dict[str, Any]]:
-        """Run the agent with a user query"""
-        initial_state = {
+
+def _format_message(msg) -> Dict[str, Any]:
+    """Convert a LangChain message into the API's role/content dict"""
+    return {
+        'role': 'assistant' if isinstance(msg, AIMessage) else 'user',
+        'content': msg.content
+    }
+
+
+class CodeAssistantAgent:
+    """Per-session handle that runs the shared LangGraph workflow against a repository"""
+
+    def __init__(self, repo_path: str = None, github_url: str = None):
+        self.repo_path = repo_path
+        self.github_url = github_url
+
+        # Only the filesystem server is session specific; the LLM client,
+        # analyzer and compiled graph are shared across sessions
+        self.fs_mcp = FileSystemMCP(repo_path) if repo_path else None
+
+    def _initial_state(self, user_query: str) -> AgentState:
+        """Build the graph input for a user query"""
+        return {
             'messages': [],
             'repo_path': self.repo_path or '',
             'github_url': self.github_url or '',
             'current_step': 'start',
             'analysis_results': {},
-            'user_query': user_query
+            'user_query': user_query,
+            'fs_mcp': self.fs_mcp
         }
 
-        final_state = self.graph.invoke(initial_state)
+    async def run(self, user_query: str) -> List[Dict[str, Any]]:
+        """Run the agent with a user query"""
+        final_state = await get_graph().ainvoke(self._initial_state(user_query))
 
         # Format messages for return
-        messages = []
-        for msg in final_state['messages']:
-            messages.append({
-                'role': 'assistant' if isinstance(msg, AIMessage) else 'user',
-                'content': msg.content
-            })
-
-        return messages
+        return [_format_message(msg) for msg in final_state['messages']]
+
+    async def stream(self, user_query: str) -> AsyncIterator[Dict[str, Any]]:
+        """Run the agent, yielding each message as soon as its step completes"""
+        seen = 0
+        async for state in get_graph().astream(self._initial_state(user_query), stream_mode="values"):
+            for msg in state['messages'][seen:]:
+                yield _format_message(msg)
+            seen = len(state['messages'])
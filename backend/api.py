@@ -3,26 +3,35 @@ FastAPI Backend for Code Assistant
 Provides REST API endpoints for the agent
 """
 
+import asyncio
+import hashlib
 import os
 import shutil
 import tempfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, List, Dict, Any
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 import git
+import orjson
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 from agent import CodeAssistantAgent
+from mcp_servers.filesystem_server import ALLOWED_EXTENSIONS, IGNORED_DIRS
+from warmup import warmup
 
 load_dotenv()
 
 app = FastAPI(
     title="Code Assistant API",
     description="AI-powered code analysis and assistance",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
@@ -34,9 +43,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+class SessionStore:
+    """Active agent sessions and the temporary directories backing them"""
+
+    def __init__(self):
+        self._agents: Dict[str, CodeAssistantAgent] = {}
+        self._temp_dirs: Dict[str, str] = {}
+        self._lock = asyncio.Lock()
+
+    async def add(self, session_id: str, agent: CodeAssistantAgent, temp_dir: str):
+        """Register a session and its temporary directory"""
+        async with self._lock:
+            self._agents[session_id] = agent
+            self._temp_dirs[session_id] = temp_dir
+
+    async def remove(self, session_id: str) -> Optional[str]:
+        """Forget a session, returning its temporary directory if any"""
+        async with self._lock:
+            self._agents.pop(session_id, None)
+            return self._temp_dirs.pop(session_id, None)
+
+    def get(self, session_id: str) -> Optional[CodeAssistantAgent]:
+        """Return the agent for a session, or None if it does not exist"""
+        return self._agents.get(session_id)
+
+    def session_ids(self) -> List[str]:
+        """Return the ids of all active sessions"""
+        return list(self._agents)
+
+    def temp_dirs(self) -> List[str]:
+        """Return the temporary directories of all active sessions"""
+        return list(self._temp_dirs.values())
+
+
 # Store active sessions
-sessions: Dict[str, CodeAssistantAgent] = {}
-temp_dirs: Dict[str, str] = {}
+sessions = SessionStore()
+
+# Agent messages for recent (session, query) pairs, served when a client passes ?cache=1
+response_cache = TTLCache(maxsize=1024, ttl=900)
+
+# Worker threads used to extract uploaded ZIP archives
+ZIP_EXTRACT_WORKERS = 8
+
+
+def response_cache_key(session_id: str, query: str) -> tuple:
+    """Key a cached response by session and a digest of the query text"""
+    return session_id, hashlib.blake2b(query.encode(), digest_size=16).hexdigest()
 
 
 class QueryRequest(BaseModel):
@@ -59,6 +112,56 @@ class GitHubRequest(BaseModel):
     repo_url: str
 
 
+def extract_zip(zip_file, extract_dir: Path):
+    """Extract the file types the filesystem server can serve from a ZIP"""
+    with zipfile.ZipFile(zip_file, 'r') as zip_ref:
+        # Duplicate names would overwrite each other, so only the last entry is written
+        members = {
+            info.filename: info
+            for info in zip_ref.infolist()
+            if not info.is_dir() and os.path.splitext(info.filename)[1] in ALLOWED_EXTENSIONS
+        }
+
+        def extract(info: zipfile.ZipInfo):
+            try:
+                zip_ref.extract(info, extract_dir)
+            except FileExistsError:
+                # Another worker created the parent directory first
+                zip_ref.extract(info, extract_dir)
+
+        # zlib releases the GIL while inflating, so members decompress in parallel
+        with ThreadPoolExecutor(max_workers=ZIP_EXTRACT_WORKERS) as executor:
+            list(executor.map(extract, members.values()))
+
+
+def clone_repo(repo_url: str, repo_dir: Path):
+    """Partially clone a repository, checking out only files the filesystem server can serve"""
+    # Blobs are fetched on demand, so files outside the sparse patterns are never downloaded
+    repo = git.Repo.clone_from(
+        repo_url,
+        repo_dir,
+        multi_options=['--depth=1', '--filter=blob:none', '--sparse']
+    )
+    repo.git.sparse_checkout('set', '--no-cone', *(f'*{ext}' for ext in sorted(ALLOWED_EXTENSIONS)))
+
+
+def count_files(root: str) -> int:
+    """Count repository files under root, skipping the directories list_files skips"""
+    count = 0
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                # DirEntry caches the type from the directory read, so no extra stat
+                if entry.is_dir(follow_symlinks=False):
+                    if not entry.name.startswith('.') and entry.name not in IGNORED_DIRS:
+                        stack.append(entry.path)
+                elif '.' in entry.name:
+                    # Only files with an extension count, like the upload response always reported
+                    count += 1
+    return count
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
@@ -83,26 +186,22 @@ async def upload_zip(
     session_id = Path(temp_dir).name
 
     try:
-        # Save uploaded file
-        zip_path = Path(temp_dir) / file.filename
-        with open(zip_path, 'wb') as f:
-            content = await file.read()
-            f.write(content)
-
         # Extract ZIP
         extract_dir = Path(temp_dir) / "repo"
         extract_dir.mkdir(exist_ok=True)
 
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            zip_ref.extractall(extract_dir)
+        # Extraction and counting block on disk I/O, so keep them off the event loop
+        await asyncio.to_thread(extract_zip, file.file, extract_dir)
 
         # Count files
-        files_count = len(list(extract_dir.rglob('*.*')))
+        files_count = await asyncio.to_thread(count_files, str(extract_dir))
 
         # Create agent session
         agent = CodeAssistantAgent(repo_path=str(extract_dir))
-        sessions[session_id] = agent
-        temp_dirs[session_id] = temp_dir
+        await sessions.add(session_id, agent, temp_dir)
+
+        # Index source files after responding so keyword searches skip file scans
+        background_tasks.add_task(agent.fs_mcp.build_index)
 
         return UploadResponse(
             session_id=session_id,
@@ -117,27 +216,29 @@ async def upload_zip(
 
 
 @app.post("/upload/github", response_model=UploadResponse)
-async def upload_github(request: GitHubRequest):
+async def upload_github(request: GitHubRequest, background_tasks: BackgroundTasks):
     """Clone a GitHub repository"""
-    try:
-        # Create temporary directory
-        temp_dir = tempfile.mkdtemp(prefix="code_assistant_")
-        session_id = Path(temp_dir).name
+    # Create temporary directory
+    temp_dir = tempfile.mkdtemp(prefix="code_assistant_")
+    session_id = Path(temp_dir).name
 
+    try:
         # Clone repository
         repo_dir = Path(temp_dir) / "repo"
-        git.Repo.clone_from(request.repo_url, repo_dir, depth=1)
+        await asyncio.to_thread(clone_repo, request.repo_url, repo_dir)
 
         # Count files
-        files_count = len(list(repo_dir.rglob('*.*')))
+        files_count = await asyncio.to_thread(count_files, str(repo_dir))
 
         # Create agent session with both local path and GitHub URL
         agent = CodeAssistantAgent(
             repo_path=str(repo_dir),
             github_url=request.repo_url
         )
-        sessions[session_id] = agent
-        temp_dirs[session_id] = temp_dir
+        await sessions.add(session_id, agent, temp_dir)
+
+        # Index source files after responding so keyword searches skip file scans
+        background_tasks.add_task(agent.fs_mcp.build_index)
 
         return UploadResponse(
             session_id=session_id,
@@ -154,14 +255,20 @@ async def upload_github(request: GitHubRequest):
 
 
 @app.post("/query", response_model=QueryResponse)
-async def query_agent(request: QueryRequest):
+async def query_agent(request: QueryRequest, cache: bool = False):
     """Send a query to the code assistant agent"""
-    if request.session_id not in sessions:
+    agent = sessions.get(request.session_id)
+    if agent is None:
         raise HTTPException(status_code=404, detail="Session not found. Please upload a repository first.")
 
+    key = response_cache_key(request.session_id, request.query)
+    messages = response_cache.get(key) if cache else None
+    if messages is not None:
+        return QueryResponse(session_id=request.session_id, messages=messages)
+
     try:
-        agent = sessions[request.session_id]
-        messages = agent.run(request.query)
+        messages = await agent.run(request.query)
+        response_cache[key] = messages
 
         return QueryResponse(
             session_id=request.session_id,
@@ -172,16 +279,44 @@ async def query_agent(request: QueryRequest):
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
+@app.post("/query/stream")
+async def query_agent_stream(request: QueryRequest, cache: bool = False):
+    """Send a query to the agent, streaming each step's message as a Server-Sent Event"""
+    agent = sessions.get(request.session_id)
+    if agent is None:
+        raise HTTPException(status_code=404, detail="Session not found. Please upload a repository first.")
+
+    key = response_cache_key(request.session_id, request.query)
+    cached = response_cache.get(key) if cache else None
+
+    async def events():
+        try:
+            if cached is not None:
+                for message in cached:
+                    yield b"data: " + orjson.dumps(message) + b"\n\n"
+            else:
+                messages = []
+                async for message in agent.stream(request.query):
+                    messages.append(message)
+                    yield b"data: " + orjson.dumps(message) + b"\n\n"
+                response_cache[key] = messages
+        except Exception as e:
+            yield b"event: error\ndata: " + orjson.dumps({"detail": f"Query failed: {str(e)}"}) + b"\n\n"
+        yield b"event: done\ndata: {}\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @app.delete("/session/{session_id}")
 async def delete_session(session_id: str):
     """Delete a session and cleanup temporary files"""
-    if session_id in sessions:
-        del sessions[session_id]
+    temp_dir = await sessions.remove(session_id)
 
-    if session_id in temp_dirs:
-        temp_dir = temp_dirs[session_id]
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        del temp_dirs[session_id]
+    for key in [key for key in response_cache if key[0] == session_id]:
+        response_cache.pop(key, None)
+
+    if temp_dir:
+        await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
 
     return {"message": "Session deleted successfully"}
 
@@ -189,23 +324,36 @@ async def delete_session(session_id: str):
 @app.get("/sessions")
 async def list_sessions():
     """List active sessions"""
+    session_ids = sessions.session_ids()
     return {
-        "sessions": list(sessions.keys()),
-        "count": len(sessions)
+        "sessions": session_ids,
+        "count": len(session_ids)
     }
 
 
+@app.on_event("startup")
+async def startup_event():
+    """Build shared agent resources before the first request"""
+    warmup()
+
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
-    for temp_dir in temp_dirs.values():
+    for temp_dir in sessions.temp_dirs():
         shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 if __name__ == "__main__":
+    import sys
     import uvicorn
+
+    # uvloop and httptools ship with uvicorn[standard]; uvloop has no Windows build.
+    # Sessions live in process memory, so the server runs a single worker.
     uvicorn.run(
         app,
         host=os.getenv("API_HOST", "0.0.0.0"),
-        port=int(os.getenv("API_PORT", 8000))
+        port=int(os.getenv("API_PORT", 8000)),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
     )
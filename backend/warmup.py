@@ -0,0 +1,34 @@
+"""
+Startup warmup for the Code Assistant backend
+Builds the shared agent resources before the first request needs them
+"""
+
+from agent import get_llm, get_planner, get_graph, get_analyzer_mcp
+
+
+WARMUP_SOURCE = '''
+class Greeter:
+    """Say hello"""
+
+    def greet(self, name):
+        # TODO: localize
+        return f"Hello, {name}"
+'''
+
+
+def warmup() -> None:
+    """Compile the agent graph, create the LLM client and exercise the analyzer"""
+    get_graph()
+
+    # Runs the ast, tokenize and radon code paths once so their lazily
+    # compiled tokenizer patterns are ready before the first query
+    analyzer = get_analyzer_mcp()
+    analysis = analyzer.analyze_python_file(WARMUP_SOURCE, 'warmup.py')
+    analyzer.suggest_improvements(analysis)
+
+    try:
+        get_llm()
+        get_planner()
+    except Exception:
+        # Missing credentials surface on the first query instead
+        pass
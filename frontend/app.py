@@ -5,7 +5,9 @@ Interactive chat interface with code analysis visualization
 
 import streamlit as st
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import orjson
 from pathlib import Path
 import time
 import os
@@ -65,13 +67,23 @@ if 'repo_uploaded' not in st.session_state:
     st.session_state.repo_uploaded = False
 
 
+@st.cache_resource
+def api_session():
+    """Shared HTTP session so backend calls reuse keep-alive connections"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
 def upload_zip_file(file):
     """Upload ZIP file to backend"""
     files = {'file': (file.name, file, 'application/zip')}
     try:
-        response = requests.post(f"{API_URL}/upload/zip", files=files)
+        response = api_session().post(f"{API_URL}/upload/zip", files=files)
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     except Exception as e:
         st.error(f"Upload failed: {str(e)}")
         return None
@@ -80,29 +92,43 @@ def upload_zip_file(file):
 def clone_github_repo(repo_url):
     """Clone GitHub repository"""
     try:
-        response = requests.post(
+        response = api_session().post(
             f"{API_URL}/upload/github",
             json={"repo_url": repo_url}
         )
         response.raise_for_status()
-        return response.json()
+        return orjson.loads(response.content)
     except Exception as e:
         st.error(f"Clone failed: {str(e)}")
         return None
 
 
-def send_query(session_id, query):
-    """Send query to agent"""
+def stream_query(session_id, query, cache=False):
+    """Send query to agent, yielding each message as the backend streams it"""
     try:
-        response = requests.post(
-            f"{API_URL}/query",
-            json={"session_id": session_id, "query": query}
-        )
-        response.raise_for_status()
-        return response.json()
+        with api_session().post(
+            f"{API_URL}/query/stream",
+            json={"session_id": session_id, "query": query},
+            params={"cache": 1} if cache else None,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+
+            # Parse the Server-Sent Events stream
+            event = "message"
+            for line in response.iter_lines():
+                if line.startswith(b"event:"):
+                    event = line[len(b"event:"):].strip().decode()
+                elif line.startswith(b"data:"):
+                    data = orjson.loads(line[len(b"data:"):])
+                    if event == "error":
+                        st.error(data['detail'])
+                    elif event == "message":
+                        yield data
+                elif not line:
+                    event = "message"
     except Exception as e:
         st.error(f"Query failed: {str(e)}")
-        return None
 
 
 # Header
@@ -166,7 +192,7 @@ with st.sidebar:
 
         if st.button("Clear Session"):
             try:
-                requests.delete(f"{API_URL}/session/{st.session_state.session_id}")
+                api_session().delete(f"{API_URL}/session/{st.session_state.session_id}")
             except:
                 pass
             st.session_state.session_id = None
@@ -223,8 +249,9 @@ else:
     # Chat input
     query = st.chat_input("Ask me about your code...")
 
-    # Handle example query
-    if 'example_query' in st.session_state:
+    # Handle example query; repeated examples may be served from the backend cache
+    use_cache = 'example_query' in st.session_state
+    if use_cache:
         query = st.session_state.example_query
         del st.session_state.example_query
 
@@ -238,16 +265,13 @@ else:
         # Get agent response
         with st.chat_message("assistant"):
             with st.spinner("🤔 Analyzing your code..."):
-                response = send_query(st.session_state.session_id, query)
-
-                if response:
-                    # Display all intermediate messages
-                    for msg in response['messages']:
-                        st.markdown(msg['content'])
+                # Display intermediate messages as each agent step completes
+                for msg in stream_query(st.session_state.session_id, query, cache=use_cache):
+                    st.markdown(msg['content'])
 
-                        # Add to session state
-                        if msg not in st.session_state.messages:
-                            st.session_state.messages.append(msg)
+                    # Add to session state
+                    if msg not in st.session_state.messages:
+                        st.session_state.messages.append(msg)
 
 # Footer
 st.divider()
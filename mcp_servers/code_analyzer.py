@@ -4,11 +4,191 @@ Provides tools for analyzing code quality, complexity, and patterns
 """
 
 import ast
+import copy
+import hashlib
+import io
 import re
+import threading
+import tokenize
+import weakref
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
 from pathlib import Path
 from typing import List, Dict, Any, Optional
-from radon.complexity import cc_visit
-from radon.metrics import mi_visit, h_visit
+from radon.metrics import mi_compute, h_visit, h_visit_ast
+from radon.raw import analyze as raw_analyze, Module, _logical, is_single_token
+from radon.visitors import ComplexityVisitor
+
+# Number of analysis results kept per analyzer instance
+RESULT_CACHE_SIZE = 256
+
+# Number of parsed syntax trees kept per analyzer instance
+AST_CACHE_SIZE = 64
+
+# Whitespace that str.splitlines() doesn't treat as a line boundary
+_INLINE_SPACE = r'[^\S\n\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]*'
+
+# All line-level issue patterns in one alternation, so the whole file is
+# scanned by the regex engine once; the group name identifies the issue.
+# No pattern can match across a line boundary.
+ISSUE_RE = re.compile(
+    r'(?P<eval>eval\()'
+    r'|(?P<exec>exec\()'
+    r'|(?P<password>(?i:password)' + _INLINE_SPACE + '=' + _INLINE_SPACE + r'["\'])'
+    r'|(?P<todo>TODO|FIXME)'
+)
+
+# (type, severity, message, suggestion) for each ISSUE_RE group, in the
+# order issues are reported for a line
+ISSUE_TEMPLATES = {
+    'eval': ('security', 'high', 'Use of eval() is dangerous',
+             'Consider using ast.literal_eval() or safer alternatives'),
+    'exec': ('security', 'high', 'Use of exec() is dangerous',
+             'Avoid dynamic code execution'),
+    'password': ('security', 'critical', 'Hardcoded password detected',
+                 'Use environment variables or secure secret management'),
+    'todo': ('maintenance', 'low', 'TODO/FIXME comment found',
+             'Address this comment or create a ticket'),
+}
+
+# Lines longer than this are reported as style issues
+LONG_LINE_THRESHOLD = 120
+
+# Line boundaries recognised by str.splitlines() other than \n and \r
+RARE_LINE_BREAKS_RE = re.compile('[\x0b\x0c\x1c-\x1e\x85\u2028\u2029]')
+
+
+def count_lines(content: str) -> int:
+    """Number of lines content.splitlines() returns, without building the list"""
+    if not content:
+        return 0
+    if RARE_LINE_BREAKS_RE.search(content):
+        return len(content.splitlines())
+
+    breaks = content.count('\n') + content.count('\r') - content.count('\r\n')
+    return breaks if content.endswith(('\n', '\r')) else breaks + 1
+
+
+def raw_metrics(source: str) -> Module:
+    """Same result as radon.raw.analyze, from a single tokenize pass.
+
+    radon re-tokenizes a growing buffer until each statement is complete,
+    which is quadratic in the length of multi-line statements. Here the
+    stripped source is tokenized once and split into the same statements
+    at NEWLINE tokens and at NL tokens outside brackets; radon's own helpers
+    then score each statement. Anything unexpected falls back to radon.
+    """
+    lines = [line.strip() for line in source.splitlines()]
+    if not lines:
+        return Module(0, 0, 0, 0, 0, 0, 0)
+
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO('\n'.join(lines)).readline))
+    except (tokenize.TokenError, SyntaxError):
+        return raw_analyze(source)
+
+    lloc = comments = single_comments = multi = blank = sloc = 0
+    statement = []
+    depth = 0
+    first_row = 1
+
+    for token in tokens:
+        token_type = token[0]
+        if token_type == tokenize.ENDMARKER:
+            break
+        if token_type == tokenize.ERRORTOKEN:
+            return raw_analyze(source)
+
+        statement.append(token)
+        if token_type == tokenize.OP:
+            if token[1] in '([{':
+                depth += 1
+            elif token[1] in ')]}':
+                depth -= 1
+            continue
+        if token_type != tokenize.NEWLINE and (token_type != tokenize.NL or depth):
+            continue
+
+        # radon tokenized each statement on its own, so it ended in ENDMARKER
+        row = token[2][0]
+        statement.append(tokenize.TokenInfo(tokenize.ENDMARKER, '', (row + 1, 0), (row + 1, 0), ''))
+        statement_lines = lines[first_row - 1:row]
+        non_empty = sum(1 for line in statement_lines if line)
+
+        comments += sum(1 for t in statement if t[0] == tokenize.COMMENT)
+        if is_single_token(tokenize.COMMENT, statement):
+            single_comments += 1
+        elif is_single_token(tokenize.STRING, statement):
+            if statement[0][2][0] == statement[0][3][0]:
+                single_comments += 1
+            else:
+                multi += non_empty
+                blank += len(statement_lines) - non_empty
+        else:
+            sloc += non_empty
+            blank += len(statement_lines) - non_empty
+        lloc += _logical(statement)
+
+        statement = []
+        first_row = row + 1
+
+    # Trailing empty lines produce no tokens
+    for line in lines[first_row - 1:]:
+        if line:
+            return raw_analyze(source)
+        blank += 1
+
+    return Module(sloc + blank + multi + single_comments, lloc, sloc, comments, multi, blank, single_comments)
+
+
+def content_hash(content: str) -> bytes:
+    """Fast, collision-resistant digest of source content"""
+    return hashlib.blake2b(content.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+class _DefinitionVisitor(ast.NodeVisitor):
+    """Collects function, class and import nodes in a single traversal"""
+
+    def __init__(self):
+        self.functions = []
+        self.classes = []
+        self.imports = []
+
+    def visit_FunctionDef(self, node):
+        self.functions.append(node)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self.classes.append(node)
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        self.imports.append(node)
+
+    visit_ImportFrom = visit_Import
+
+
+# Definitions found in each parsed tree, dropped together with the tree
+_definitions_cache: 'weakref.WeakKeyDictionary[ast.AST, tuple]' = weakref.WeakKeyDictionary()
+
+
+def collect_definitions(tree: ast.AST) -> tuple:
+    """Return the (functions, classes, imports) nodes of a tree, in source order"""
+    definitions = _definitions_cache.get(tree)
+    if definitions is None:
+        visitor = _DefinitionVisitor()
+        visitor.visit(tree)
+        definitions = (tuple(visitor.functions), tuple(visitor.classes), tuple(visitor.imports))
+        _definitions_cache[tree] = definitions
+    return definitions
+
+
+def method_nodes(class_node: ast.ClassDef) -> List[ast.AST]:
+    """Functions defined directly in a class body"""
+    return [n for n in class_node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
 
 
 class CodeAnalyzerMCP:
@@ -28,10 +208,60 @@ class CodeAnalyzerMCP:
             }
         }
 
+        # LRU of results keyed by (method, arguments, content hash); the
+        # analyzer is shared between threads so access is locked
+        self._results: OrderedDict = OrderedDict()
+        self._results_lock = threading.Lock()
+
+        # LRU of parsed trees keyed by content hash, shared by the methods
+        # that need a tree so one content is parsed once
+        self._trees: OrderedDict = OrderedDict()
+        self._trees_lock = threading.Lock()
+
+    def _get_ast(self, content: str) -> ast.Module:
+        """Parse content, reusing the tree from an earlier call on the same content"""
+        key = content_hash(content)
+        with self._trees_lock:
+            tree = self._trees.get(key)
+            if tree is not None:
+                self._trees.move_to_end(key)
+                return tree
+
+        tree = ast.parse(content)
+
+        with self._trees_lock:
+            self._trees[key] = tree
+            if len(self._trees) > AST_CACHE_SIZE:
+                self._trees.popitem(last=False)
+
+        return tree
+
+    def _cached(self, key: tuple, compute) -> Any:
+        """Return a copy of the cached result for key, computing it on a miss"""
+        with self._results_lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return copy.deepcopy(self._results[key])
+
+        result = compute()
+
+        with self._results_lock:
+            self._results[key] = result
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+
+        return copy.deepcopy(result)
+
     def analyze_python_file(self, content: str, file_path: str) -> Dict[str, Any]:
         """Analyze Python file for various metrics"""
+        return self._cached(
+            ('analyze_python_file', file_path, content_hash(content)),
+            lambda: self._analyze_python_file(content, file_path)
+        )
+
+    def _analyze_python_file(self, content: str, file_path: str) -> Dict[str, Any]:
         try:
-            tree = ast.parse(content)
+            tree = self._get_ast(content)
 
             analysis = {
                 'file': file_path,
@@ -43,51 +273,59 @@ class CodeAnalyzerMCP:
                 'issues': []
             }
 
-            # Extract functions and classes
-            for node in ast.walk(tree):
-                if isinstance(node, ast.FunctionDef):
-                    analysis['functions'].append({
-                        'name': node.name,
-                        'line': node.lineno,
-                        'args': len(node.args.args),
-                        'decorators': len(node.decorator_list)
-                    })
-                elif isinstance(node, ast.ClassDef):
-                    analysis['classes'].append({
-                        'name': node.name,
-                        'line': node.lineno,
-                        'methods': len([n for n in node.body if isinstance(n, ast.FunctionDef)])
-                    })
-                elif isinstance(node, (ast.Import, ast.ImportFrom)):
-                    if isinstance(node, ast.Import):
-                        for alias in node.names:
-                            analysis['imports'].append(alias.name)
-                    else:
-                        analysis['imports'].append(node.module or '')
-
-            # Complexity analysis
+            # Extract functions, classes and imports
+            functions, classes, imports = collect_definitions(tree)
+            analysis['functions'] = [
+                {
+                    'name': node.name,
+                    'line': node.lineno,
+                    'args': len(node.args.args),
+                    'decorators': len(node.decorator_list)
+                }
+                for node in functions
+            ]
+            analysis['classes'] = [
+                {
+                    'name': node.name,
+                    'line': node.lineno,
+                    'methods': len(method_nodes(node))
+                }
+                for node in classes
+            ]
+            for node in imports:
+                if isinstance(node, ast.Import):
+                    analysis['imports'].extend(alias.name for alias in node.names)
+                else:
+                    analysis['imports'].append(node.module or '')
+            analysis['metrics']['functions_without_docs'] = sum(
+                1 for node in functions if ast.get_docstring(node) is None
+            )
+
+            # Complexity analysis, reusing the parsed tree instead of letting
+            # radon parse the source again
             try:
-                complexity = cc_visit(content)
+                complexity = ComplexityVisitor.from_ast(tree)
                 analysis['metrics']['complexity'] = [
                     {
                         'name': item.name,
                         'complexity': item.complexity,
                         'line': item.lineno
                     }
-                    for item in complexity
+                    for item in complexity.blocks
                 ]
             except Exception:
-                pass
+                complexity = None
 
             # Maintainability Index
             try:
-                mi_score = mi_visit(content, multi=True)
-                analysis['metrics']['maintainability_index'] = mi_score
+                analysis['metrics']['maintainability_index'] = self._maintainability_index(
+                    tree, content, complexity
+                )
             except Exception:
                 pass
 
             # Basic issues detection
-            analysis['issues'] = self._detect_python_issues(content)
+            analysis['issues'] = self._detect_python_issues(content, content.splitlines())
 
             return analysis
 
@@ -103,55 +341,64 @@ class CodeAnalyzerMCP:
                 'error': str(e)
             }
 
-    def _detect_python_issues(self, content: str) -> List[Dict[str, Any]]:
+    def _maintainability_index(self, tree: ast.AST, content: str,
+                               complexity: Optional[ComplexityVisitor] = None) -> float:
+        """Same as radon's mi_visit(content, multi=True), but on a parsed tree"""
+        if complexity is None:
+            complexity = ComplexityVisitor.from_ast(tree)
+        raw = raw_metrics(content)
+        comments = (raw.comments + raw.multi) / float(raw.sloc) * 100 if raw.sloc != 0 else 0
+        return mi_compute(
+            h_visit_ast(tree).total.volume,
+            complexity.total_complexity,
+            raw.lloc,
+            comments
+        )
+
+    def _detect_python_issues(self, content: str,
+                              lines: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Detect common Python issues"""
         issues = []
-        lines = content.splitlines()
-
-        for line_num, line in enumerate(lines, 1):
-            # Check for common issues
-            if 'eval(' in line:
-                issues.append({
-                    'type': 'security',
-                    'severity': 'high',
-                    'line': line_num,
-                    'message': 'Use of eval() is dangerous',
-                    'suggestion': 'Consider using ast.literal_eval() or safer alternatives'
-                })
-
-            if 'exec(' in line:
-                issues.append({
-                    'type': 'security',
-                    'severity': 'high',
-                    'line': line_num,
-                    'message': 'Use of exec() is dangerous',
-                    'suggestion': 'Avoid dynamic code execution'
-                })
-
-            if re.search(r'password\s*=\s*["\']', line, re.IGNORECASE):
-                issues.append({
-                    'type': 'security',
-                    'severity': 'critical',
-                    'line': line_num,
-                    'message': 'Hardcoded password detected',
-                    'suggestion': 'Use environment variables or secure secret management'
-                })
+        if lines is None:
+            lines = content.splitlines()
+
+        # Issue kinds per line number, from one scan over the whole file;
+        # line numbers come from the offsets where splitlines() breaks
+        found: Dict[int, set] = {}
+        matches = list(ISSUE_RE.finditer(content))
+        if matches:
+            line_ends = list(accumulate(map(len, content.splitlines(keepends=True))))
+            for match in matches:
+                line_num = bisect_right(line_ends, match.start()) + 1
+                found.setdefault(line_num, set()).add(match.lastgroup)
+
+        # The length of each line only matters if the longest one is over the limit
+        long_lines = {}
+        if max(map(len, lines), default=0) > LONG_LINE_THRESHOLD:
+            long_lines = {
+                line_num: len(line)
+                for line_num, line in enumerate(lines, 1)
+                if len(line) > LONG_LINE_THRESHOLD
+            }
 
-            if 'TODO' in line or 'FIXME' in line:
-                issues.append({
-                    'type': 'maintenance',
-                    'severity': 'low',
-                    'line': line_num,
-                    'message': 'TODO/FIXME comment found',
-                    'suggestion': 'Address this comment or create a ticket'
-                })
+        for line_num in sorted(found.keys() | long_lines.keys()):
+            kinds = found.get(line_num, ())
+            for kind, (issue_type, severity, message, suggestion) in ISSUE_TEMPLATES.items():
+                if kind in kinds:
+                    issues.append({
+                        'type': issue_type,
+                        'severity': severity,
+                        'line': line_num,
+                        'message': message,
+                        'suggestion': suggestion
+                    })
 
-            if len(line) > 120:
+            if line_num in long_lines:
                 issues.append({
                     'type': 'style',
                     'severity': 'low',
                     'line': line_num,
-                    'message': f'Line too long ({len(line)} characters)',
+                    'message': f'Line too long ({long_lines[line_num]} characters)',
                     'suggestion': 'Break into multiple lines (PEP 8 recommends max 79-120)'
                 })
 
@@ -159,22 +406,27 @@ class CodeAnalyzerMCP:
 
     def find_functions(self, content: str, language: str = 'python') -> List[Dict[str, Any]]:
         """Find all function definitions in code"""
+        return self._cached(
+            ('find_functions', language, content_hash(content)),
+            lambda: self._find_functions(content, language)
+        )
+
+    def _find_functions(self, content: str, language: str) -> List[Dict[str, Any]]:
         functions = []
 
         if language == 'python':
             try:
-                tree = ast.parse(content)
-                for node in ast.walk(tree):
-                    if isinstance(node, ast.FunctionDef):
-                        # Get docstring if available
-                        docstring = ast.get_docstring(node)
-                        functions.append({
-                            'name': node.name,
-                            'line': node.lineno,
-                            'args': [arg.arg for arg in node.args.args],
-                            'docstring': docstring[:100] if docstring else None,
-                            'is_async': isinstance(node, ast.AsyncFunctionDef)
-                        })
+                tree = self._get_ast(content)
+                for node in collect_definitions(tree)[0]:
+                    # Get docstring if available
+                    docstring = ast.get_docstring(node)
+                    functions.append({
+                        'name': node.name,
+                        'line': node.lineno,
+                        'args': [arg.arg for arg in node.args.args],
+                        'docstring': docstring[:100] if docstring else None,
+                        'is_async': isinstance(node, ast.AsyncFunctionDef)
+                    })
             except Exception:
                 pass
 
@@ -192,22 +444,26 @@ class CodeAnalyzerMCP:
 
     def find_classes(self, content: str, language: str = 'python') -> List[Dict[str, Any]]:
         """Find all class definitions in code"""
+        return self._cached(
+            ('find_classes', language, content_hash(content)),
+            lambda: self._find_classes(content, language)
+        )
+
+    def _find_classes(self, content: str, language: str) -> List[Dict[str, Any]]:
         classes = []
 
         if language == 'python':
             try:
-                tree = ast.parse(content)
-                for node in ast.walk(tree):
-                    if isinstance(node, ast.ClassDef):
-                        docstring = ast.get_docstring(node)
-                        methods = [n.name for n in node.body if isinstance(n, ast.FunctionDef)]
-                        classes.append({
-                            'name': node.name,
-                            'line': node.lineno,
-                            'methods': methods,
-                            'docstring': docstring[:100] if docstring else None,
-                            'bases': [b.id for b in node.bases if isinstance(b, ast.Name)]
-                        })
+                tree = self._get_ast(content)
+                for node in collect_definitions(tree)[1]:
+                    docstring = ast.get_docstring(node)
+                    classes.append({
+                        'name': node.name,
+                        'line': node.lineno,
+                        'methods': [n.name for n in method_nodes(node)],
+                        'docstring': docstring[:100] if docstring else None,
+                        'bases': [b.id for b in node.bases if isinstance(b, ast.Name)]
+                    })
             except Exception:
                 pass
 
@@ -215,34 +471,46 @@ class CodeAnalyzerMCP:
 
     def calculate_metrics(self, content: str, language: str = 'python') -> Dict[str, Any]:
         """Calculate various code metrics"""
+        return self._cached(
+            ('calculate_metrics', language, content_hash(content)),
+            lambda: self._calculate_metrics(content, language)
+        )
+
+    def _calculate_metrics(self, content: str, language: str) -> Dict[str, Any]:
+        if language != 'python':
+            # Only the line count is computed for other languages
+            return {
+                'total_lines': count_lines(content),
+                'code_lines': 0,
+                'comment_lines': 0,
+                'blank_lines': 0
+            }
+
         lines = content.splitlines()
 
-        metrics = {
+        # Tally in locals and derive code lines at the end; only leading
+        # whitespace matters for classifying a line
+        blank_lines = 0
+        comment_lines = 0
+        in_multiline_comment = False
+        for line in lines:
+            stripped = line.lstrip()
+
+            if not stripped:
+                blank_lines += 1
+            elif stripped.startswith(('"""', "'''")):
+                in_multiline_comment = not in_multiline_comment
+                comment_lines += 1
+            elif in_multiline_comment or stripped.startswith('#'):
+                comment_lines += 1
+
+        return {
             'total_lines': len(lines),
-            'code_lines': 0,
-            'comment_lines': 0,
-            'blank_lines': 0
+            'code_lines': len(lines) - blank_lines - comment_lines,
+            'comment_lines': comment_lines,
+            'blank_lines': blank_lines
         }
 
-        if language == 'python':
-            in_multiline_comment = False
-            for line in lines:
-                stripped = line.strip()
-
-                if not stripped:
-                    metrics['blank_lines'] += 1
-                elif stripped.startswith('"""') or stripped.startswith("'''"):
-                    in_multiline_comment = not in_multiline_comment
-                    metrics['comment_lines'] += 1
-                elif in_multiline_comment:
-                    metrics['comment_lines'] += 1
-                elif stripped.startswith('#'):
-                    metrics['comment_lines'] += 1
-                else:
-                    metrics['code_lines'] += 1
-
-        return metrics
-
     def suggest_improvements(self, analysis: Dict[str, Any]) -> List[str]:
         """Generate improvement suggestions based on analysis"""
         suggestions = []
@@ -268,14 +536,12 @@ class CodeAnalyzerMCP:
                     "Consider refactoring for better code quality."
                 )
 
-        # Check for missing docstrings
-        functions_without_docs = [
-            f for f in analysis.get('functions', [])
-            if not f.get('docstring')
-        ]
-        if len(functions_without_docs) > 3:
+        # Check for missing docstrings, counted by analyze_python_file; the
+        # function entries themselves don't carry docstrings
+        functions_without_docs = analysis.get('metrics', {}).get('functions_without_docs', 0)
+        if functions_without_docs > 3:
             suggestions.append(
-                f"📝 {len(functions_without_docs)} functions lack docstrings. "
+                f"📝 {functions_without_docs} functions lack docstrings. "
                 "Add documentation for better maintainability."
             )
 
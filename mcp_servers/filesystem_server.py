@@ -4,10 +4,88 @@ Provides tools for reading, searching, and analyzing code files
 """
 
 import os
+import re
+import codecs
 import json
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import fnmatch
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+# File types the server lists, reads and searches
+ALLOWED_EXTENSIONS = frozenset({
+    '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h',
+    '.go', '.rs', '.php', '.rb', '.cs', '.swift', '.kt', '.scala',
+    '.md', '.txt', '.json', '.yaml', '.yml', '.toml', '.xml', '.html', '.css'
+})
+
+# Maximum number of cached list/search results per repository
+RESULT_CACHE_SIZE = 1024
+
+# Directory names list_files never descends into, besides hidden ones
+IGNORED_DIRS = frozenset({'node_modules', 'venv', '__pycache__', 'dist', 'build'})
+
+# Directory names get_file_structure leaves out, besides hidden ones
+TREE_IGNORED_DIRS = frozenset({'node_modules', 'venv', '__pycache__'})
+
+# Threads used to read and scan files when searching without the index
+SEARCH_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+
+# Files handed to a search thread at a time
+SEARCH_BATCH_SIZE = 64
+
+# Shared by every search so concurrent queries don't each start their own threads
+SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix='fs-search')
+
+# Tokens stored in the search index
+TOKEN_RE = re.compile(r'\w+')
+
+
+# UTF-8 encodings of the non-ASCII characters whose lowercase form contains
+# an ASCII letter (İ -> i̇, K -> k)
+ASCII_LOWERING_BYTES = {'i': '\u0130'.encode('utf-8'), 'k': '\u212a'.encode('utf-8')}
+
+
+# Bytes read from the start of a file to decide whether it is text
+BINARY_SNIFF_SIZE = 8192
+
+
+def looks_binary(head: bytes) -> bool:
+    """Whether the first bytes of a file show it isn't UTF-8 text"""
+    if b'\x00' in head:
+        return True
+    if len(head) < BINARY_SNIFF_SIZE:
+        # The whole file was read; decoding it reports any other problem
+        return False
+    try:
+        # Incremental, so a character cut off at the end of head is fine
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+def decode_text(data: bytes) -> str:
+    """Decode UTF-8 file bytes with the same newline translation as text mode"""
+    content = data.decode('utf-8')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
+
+
+def file_suffix(name: str) -> str:
+    """Extension of a file name, same as Path(name).suffix"""
+    dot = name.rfind('.')
+    return name[dot:] if 0 < dot < len(name) - 1 else ''
+
+
+@lru_cache(maxsize=256)
+def compile_glob(pattern: str) -> re.Pattern:
+    """Translate a filename glob into a compiled regex once per pattern"""
+    return re.compile(fnmatch.translate(os.path.normcase(pattern)))
 
 
 class FileSystemMCP:
@@ -15,36 +93,88 @@ class FileSystemMCP:
 
     def __init__(self, repo_path: str):
         self.repo_path = Path(repo_path)
-        self.allowed_extensions = {
-            '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h',
-            '.go', '.rs', '.php', '.rb', '.cs', '.swift', '.kt', '.scala',
-            '.md', '.txt', '.json', '.yaml', '.yml', '.toml', '.xml', '.html', '.css'
-        }
+        self.allowed_extensions = ALLOWED_EXTENSIONS
+
+        # Cached list_files/search_in_files results. Uploaded trees don't
+        # change after extraction; anything that edits one calls clear_caches
+        self._list_cache: Dict[str, List[Dict[str, Any]]] = {}
+        self._search_cache: Dict[tuple, List[Dict[str, Any]]] = {}
+        self._generation = 0
+
+        # Token index built by build_index for one file pattern
+        self._index = None
+
+    def clear_caches(self):
+        """Drop cached listings, search results and the index after the tree changed"""
+        self._list_cache = {}
+        self._search_cache = {}
+        self._index = None
+        self._generation += 1
+
+    @staticmethod
+    def _store(cache: Dict, key, value: List[Dict[str, Any]]):
+        """Store a result, evicting everything once the cache is full"""
+        if len(cache) >= RESULT_CACHE_SIZE:
+            cache.clear()
+        cache[key] = value
 
     def list_files(self, pattern: str = "*") -> List[Dict[str, Any]]:
         """List all files matching pattern in repository"""
-        files = []
+        files = self._list_cache.get(pattern)
+        if files is None:
+            files = self._scan_files(pattern)
+            self._store(self._list_cache, pattern, files)
 
-        for root, dirs, filenames in os.walk(self.repo_path):
-            # Skip hidden directories and common ignore patterns
-            dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', 'venv', '__pycache__', 'dist', 'build']]
+        return list(files)
 
-            for filename in filenames:
-                if fnmatch.fnmatch(filename, pattern):
-                    file_path = Path(root) / filename
-                    rel_path = file_path.relative_to(self.repo_path)
+    def _scan_files(self, pattern: str) -> List[Dict[str, Any]]:
+        """Walk the repository for files matching pattern"""
+        files = []
+        match = compile_glob(pattern).match
+        root = str(self.repo_path)
+        prefix_length = len(os.path.join(root, ''))
+        allowed_extensions = self.allowed_extensions
 
-                    if file_path.suffix in self.allowed_extensions:
+        # Depth-first with os.scandir, visiting directories in the same
+        # order as a top-down os.walk
+        stack = [root]
+        while stack:
+            dir_path = stack.pop()
+            subdirs = []
+            try:
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        name = entry.name
                         try:
-                            stat = file_path.stat()
+                            is_dir = entry.is_dir()
+                        except OSError:
+                            is_dir = False
+
+                        if is_dir:
+                            # Skip hidden directories and common ignore patterns
+                            if not name.startswith('.') and name not in IGNORED_DIRS and not entry.is_symlink():
+                                subdirs.append(entry.path)
+                            continue
+
+                        if not match(os.path.normcase(name)):
+                            continue
+
+                        extension = file_suffix(name)
+                        if extension in allowed_extensions:
+                            try:
+                                size = entry.stat().st_size
+                            except OSError:
+                                continue
                             files.append({
-                                'path': str(rel_path),
-                                'size': stat.st_size,
-                                'extension': file_path.suffix,
-                                'name': filename
+                                'path': entry.path[prefix_length:],
+                                'size': size,
+                                'extension': extension,
+                                'name': name
                             })
-                        except Exception:
-                            continue
+            except OSError:
+                continue
+
+            stack.extend(reversed(subdirs))
 
         return files
 
@@ -59,9 +189,15 @@ class FileSystemMCP:
             return {'error': 'Access denied: Path outside repository'}
 
         try:
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            # Sniff the start of the file so binaries aren't read in full
+            with open(full_path, 'rb', buffering=0) as f:
+                data = f.read(BINARY_SNIFF_SIZE)
+                if looks_binary(data):
+                    return {'error': 'Binary file or encoding issue'}
+                if len(data) == BINARY_SNIFF_SIZE:
+                    data += f.read()
 
+            content = decode_text(data)
             return {
                 'path': file_path,
                 'content': content,
@@ -75,54 +211,179 @@ class FileSystemMCP:
 
     def search_in_files(self, query: str, file_pattern: str = "*.py") -> List[Dict[str, Any]]:
         """Search for text across files"""
-        results = []
-        files = self.list_files(file_pattern)
+        key = (query.lower(), file_pattern)
+        results = self._search_cache.get(key)
+        if results is None:
+            index = self._index
+            if index and index['pattern'] == file_pattern and index['generation'] == self._generation:
+                results = self._search_index(query, index)
+            if results is None:
+                results = self._search(query, file_pattern)
+            self._store(self._search_cache, key, results)
 
-        for file_info in files:
-            file_data = self.read_file(file_info['path'])
-            if 'content' in file_data:
-                lines = file_data['content'].splitlines()
+        return list(results)
+
+    def _search(self, query: str, file_pattern: str) -> List[Dict[str, Any]]:
+        """Scan files matching file_pattern for lines containing query"""
+        paths = [file_info['path'] for file_info in self.list_files(file_pattern)]
+        query_lower = query.lower()
+
+        # An ASCII query can be looked for in the raw bytes, so files are read
+        # once and only decoded and split into lines when they can contain a hit
+        needle = query_lower.encode('ascii') if query_lower.isascii() else None
+        lowering_chars = [encoded for letter, encoded in ASCII_LOWERING_BYTES.items() if letter in query_lower]
+
+        def search_batch(batch: List[str]) -> List[Dict[str, Any]]:
+            hits = []
+            for file_path in batch:
+                if needle:
+                    content = self._read_if_contains(file_path, needle, lowering_chars)
+                else:
+                    content = self.read_file(file_path).get('content')
+                if content is None:
+                    continue
+
+                lines = content.splitlines()
                 for line_num, line in enumerate(lines, 1):
-                    if query.lower() in line.lower():
-                        results.append({
-                            'file': file_info['path'],
+                    if query_lower in line.lower():
+                        hits.append({
+                            'file': file_path,
                             'line': line_num,
                             'content': line.strip(),
                             'context': self._get_context(lines, line_num)
                         })
+            return hits
+
+        # Batches of files are read and scanned concurrently; map keeps the file order
+        batches = [paths[i:i + SEARCH_BATCH_SIZE] for i in range(0, len(paths), SEARCH_BATCH_SIZE)]
+        if len(batches) <= 1 or SEARCH_WORKERS <= 1:
+            return search_batch(paths)
+
+        results = []
+        for hits in SEARCH_EXECUTOR.map(search_batch, batches):
+            results.extend(hits)
 
         return results
 
-    def get_file_structure(self) -> Dict[str, Any]:
+    def _read_if_contains(self, file_path: str, needle: bytes, lowering_chars: List[bytes]) -> Optional[str]:
+        """Text of a file whose bytes can contain an ASCII needle case-insensitively, else None"""
+        try:
+            with open(self.repo_path / file_path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        if needle not in data.lower() and not any(encoded in data for encoded in lowering_chars):
+            return None
+        # Skip the same files read_file refuses
+        if looks_binary(data[:BINARY_SNIFF_SIZE]):
+            return None
+        try:
+            return decode_text(data)
+        except UnicodeDecodeError:
+            return None
+
+    def build_index(self, file_pattern: str = "*.py"):
+        """Index the tokens of every file matching file_pattern for search_in_files"""
+        generation = self._generation
+        lines_by_file: Dict[str, List[str]] = {}
+        postings: Dict[str, List[tuple]] = {}
+
+        for file_info in self.list_files(file_pattern):
+            file_data = self.read_file(file_info['path'])
+            if 'content' not in file_data:
+                continue
+
+            lines = file_data['content'].splitlines()
+            lines_by_file[file_info['path']] = lines
+            for line_num, line in enumerate(lines, 1):
+                for token in set(TOKEN_RE.findall(line.lower())):
+                    postings.setdefault(token, []).append((file_info['path'], line_num))
+
+        self._index = {
+            'pattern': file_pattern,
+            'generation': generation,
+            'lines': lines_by_file,
+            'postings': postings
+        }
+
+    def _search_index(self, query: str, index: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Search through the token index, or return None if the query has no word characters"""
+        query_lower = query.lower()
+        tokens = TOKEN_RE.findall(query_lower)
+        if not tokens:
+            return None
+
+        # Every matching line contains the query's longest word inside one of its tokens
+        probe = max(tokens, key=len)
+        candidates = set()
+        for token, locations in index['postings'].items():
+            if probe in token:
+                candidates.update(locations)
+
+        # Report hits in the same file and line order as a full scan
+        file_order = {path: position for position, path in enumerate(index['lines'])}
+        results = []
+        for path, line_num in sorted(candidates, key=lambda hit: (file_order[hit[0]], hit[1])):
+            lines = index['lines'][path]
+            line = lines[line_num - 1]
+            if query_lower in line.lower():
+                results.append({
+                    'file': path,
+                    'line': line_num,
+                    'content': line.strip(),
+                    'context': self._get_context(lines, line_num)
+                })
+
+        return results
+
+    def get_file_structure(self, max_depth: int = 3) -> Dict[str, Any]:
         """Get directory tree structure"""
-        def build_tree(path: Path, max_depth: int = 3, current_depth: int = 0):
-            if current_depth >= max_depth:
-                return None
+        root = {'name': self.repo_path.name, 'type': 'directory', 'children': []}
+        visited = []
 
-            tree = {'name': path.name, 'type': 'directory', 'children': []}
+        # Breadth-first over directories; each entry's type comes from the
+        # scandir result instead of extra stat calls
+        queue = deque([(root, str(self.repo_path), 0)])
+        while queue:
+            tree, dir_path, depth = queue.popleft()
+            visited.append(tree)
+            subdirs = []
+            files = []
 
             try:
-                items = sorted(path.iterdir(), key=lambda x: (x.is_file(), x.name))
-                for item in items:
-                    if item.name.startswith('.') or item.name in ['node_modules', 'venv', '__pycache__']:
-                        continue
-
-                    if item.is_file() and item.suffix in self.allowed_extensions:
-                        tree['children'].append({
-                            'name': item.name,
-                            'type': 'file',
-                            'extension': item.suffix
-                        })
-                    elif item.is_dir():
-                        subtree = build_tree(item, max_depth, current_depth + 1)
-                        if subtree and subtree['children']:
-                            tree['children'].append(subtree)
+                with os.scandir(dir_path) as entries:
+                    for entry in entries:
+                        name = entry.name
+                        if name.startswith('.') or name in TREE_IGNORED_DIRS:
+                            continue
+
+                        if entry.is_file():
+                            extension = file_suffix(name)
+                            if extension in self.allowed_extensions:
+                                files.append({'name': name, 'type': 'file', 'extension': extension})
+                        elif entry.is_dir() and depth + 1 < max_depth:
+                            subdirs.append((name, entry.path))
             except PermissionError:
                 pass
 
-            return tree
+            # Directories first, then files, each sorted by name
+            subdirs.sort()
+            files.sort(key=lambda item: item['name'])
+            for name, path in subdirs:
+                subtree = {'name': name, 'type': 'directory', 'children': []}
+                tree['children'].append(subtree)
+                queue.append((subtree, path, depth + 1))
+            tree['children'].extend(files)
+
+        # Drop empty directories bottom-up, so a parent sees its pruned children
+        for tree in reversed(visited):
+            tree['children'] = [
+                child for child in tree['children']
+                if child['type'] == 'file' or child['children']
+            ]
 
-        return build_tree(self.repo_path)
+        return root
 
     def _get_context(self, lines: List[str], line_num: int, context_size: int = 2) -> List[str]:
         """Get surrounding lines for context"""
@@ -3,11 +3,22 @@ MCP Server for GitHub API Integration
 Provides tools for fetching repository data, issues, PRs, etc.
 """
 
+import asyncio
 import os
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Generator, Optional, Tuple
+import httpx
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from github import Github, GithubException
 
+# Media type requested from the GitHub REST API
+GITHUB_ACCEPT = 'application/vnd.github+json'
+
+# Concurrent requests allowed per batch file fetch, to stay within rate limits
+FETCH_CONCURRENCY = 8
+
 
 class GitHubMCP:
     """MCP Server for GitHub operations"""
@@ -17,6 +28,20 @@ class GitHubMCP:
         self.github = Github(self.token) if self.token else None
         self.headers = {'Authorization': f'token {self.token}'} if self.token else {}
 
+        # One pooled keep-alive session for every API and raw content request
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.headers.update({
+            'Accept': GITHUB_ACCEPT,
+            'Accept-Encoding': 'gzip'
+        })
+
+        # Default branch per "owner/repo", learned from get_repo_info
+        self._branch_cache: Dict[str, str] = {}
+
+        retry = Retry(total=3, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+        self.session.mount('https://', HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry))
+
     def get_repo_info(self, repo_url: str) -> Dict[str, Any]:
         """Get basic repository information"""
         try:
@@ -26,6 +51,7 @@ class GitHubMCP:
 
             if self.github:
                 repo_obj = self.github.get_repo(f"{owner}/{repo}")
+                self._branch_cache[f"{owner}/{repo}"] = repo_obj.default_branch
                 return {
                     'name': repo_obj.name,
                     'full_name': repo_obj.full_name,
@@ -40,9 +66,10 @@ class GitHubMCP:
             else:
                 # Fallback to public API
                 url = f"https://api.github.com/repos/{owner}/{repo}"
-                response = requests.get(url, headers=self.headers)
+                response = self.session.get(url)
                 if response.status_code == 200:
-                    data = response.json()
+                    data = orjson.loads(response.content)
+                    self._branch_cache[f"{owner}/{repo}"] = data['default_branch']
                     return {
                         'name': data['name'],
                         'full_name': data['full_name'],
@@ -67,10 +94,10 @@ class GitHubMCP:
             owner, repo = parts[-2], parts[-1]
 
             url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url)
 
             if response.status_code == 200:
-                contents = response.json()
+                contents = orjson.loads(response.content)
                 result = []
                 for item in contents:
                     result.append({
@@ -90,28 +117,104 @@ class GitHubMCP:
     def get_file_content(self, repo_url: str, file_path: str) -> Dict[str, Any]:
         """Get content of a specific file from GitHub"""
         try:
-            parts = repo_url.rstrip('/').split('/')
-            owner, repo = parts[-2], parts[-1]
-
-            url = f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}"
-            response = requests.get(url, headers=self.headers)
+            steps = self._file_content_steps(repo_url, file_path)
+            url = next(steps)
+            while True:
+                url = steps.send(self.session.get(url))
+        except StopIteration as done:
+            return done.value
+        except Exception as e:
+            return {'error': str(e)}
 
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('download_url'):
-                    content_response = requests.get(data['download_url'])
-                    if content_response.status_code == 200:
-                        return {
-                            'path': file_path,
-                            'content': content_response.text,
-                            'size': data.get('size', 0)
-                        }
-
-            return {'error': f'Failed to fetch file: {response.status_code}'}
+    async def get_file_content_async(self, repo_url: str, file_path: str,
+                                     client: Optional[httpx.AsyncClient] = None) -> Dict[str, Any]:
+        """Get content of a specific file from GitHub without blocking the event loop"""
+        if client is None:
+            async with self._async_client() as client:
+                return await self.get_file_content_async(repo_url, file_path, client)
 
+        try:
+            steps = self._file_content_steps(repo_url, file_path)
+            url = next(steps)
+            while True:
+                url = steps.send(await client.get(url))
+        except StopIteration as done:
+            return done.value
         except Exception as e:
             return {'error': str(e)}
 
+    def _file_content_steps(self, repo_url: str, file_path: str) -> Generator[str, Any, Dict[str, Any]]:
+        """Request sequence shared by get_file_content and its async twin.
+
+        Yields each URL to fetch and is sent back the response (requests or
+        httpx, both expose status_code, text and content); returns the result.
+        """
+        owner, repo = self._parse_repo(repo_url)
+
+        # With a known branch the raw URL can be fetched directly,
+        # skipping the contents API lookup of download_url
+        raw_url = self._raw_url(owner, repo, file_path)
+        if raw_url:
+            content_response = yield raw_url
+            if content_response.status_code == 200:
+                return {
+                    'path': file_path,
+                    'content': content_response.text,
+                    'size': len(content_response.content)
+                }
+
+        response = yield f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}"
+
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            if data.get('download_url'):
+                content_response = yield data['download_url']
+                if content_response.status_code == 200:
+                    return {
+                        'path': file_path,
+                        'content': content_response.text,
+                        'size': data.get('size', 0)
+                    }
+
+        return {'error': f'Failed to fetch file: {response.status_code}'}
+
+    @staticmethod
+    def _parse_repo(repo_url: str) -> Tuple[str, str]:
+        """Split a GitHub repository URL into owner and repo name"""
+        parts = repo_url.rstrip('/').split('/')
+        return parts[-2], parts[-1]
+
+    async def get_files_batch_async(self, repo_url: str, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """Get the contents of several files concurrently over one HTTP/2 connection"""
+        semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+        async with self._async_client() as client:
+            async def fetch(file_path: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.get_file_content_async(repo_url, file_path, client)
+
+            return await asyncio.gather(*(fetch(file_path) for file_path in file_paths))
+
+    def get_files_batch(self, repo_url: str, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """Get the contents of several files, in the order given"""
+        return asyncio.run(self.get_files_batch_async(repo_url, file_paths))
+
+    def _raw_url(self, owner: str, repo: str, file_path: str) -> Optional[str]:
+        """raw.githubusercontent.com URL of a file, if the repo's default branch is known"""
+        branch = self._branch_cache.get(f"{owner}/{repo}")
+        if branch is None:
+            return None
+        return f"https://raw.githubusercontent.com/{owner}/{repo}/{branch}/{file_path.lstrip('/')}"
+
+    def _async_client(self) -> httpx.AsyncClient:
+        """Create an HTTP/2 client authenticated like the sync session"""
+        return httpx.AsyncClient(
+            http2=True,
+            headers={**self.headers, 'Accept': GITHUB_ACCEPT},
+            timeout=30,
+            follow_redirects=True
+        )
+
     def search_code(self, query: str, repo_url: str) -> List[Dict[str, Any]]:
         """Search for code in repository"""
         try:
@@ -119,10 +222,10 @@ class GitHubMCP:
             owner, repo = parts[-2], parts[-1]
 
             url = f"https://api.github.com/search/code?q={query}+repo:{owner}/{repo}"
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url)
 
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 results = []
                 for item in data.get('items', [])[:10]:  # Limit to 10 results
                     results.append({
@@ -144,10 +247,10 @@ class GitHubMCP:
             owner, repo = parts[-2], parts[-1]
 
             url = f"https://api.github.com/repos/{owner}/{repo}/commits?per_page={limit}"
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url)
 
             if response.status_code == 200:
-                commits = response.json()
+                commits = orjson.loads(response.content)
                 result = []
                 for commit in commits:
                     result.append({
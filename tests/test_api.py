@@ -2,7 +2,9 @@
 Tests for FastAPI backend
 """
 
+import io
 import pytest
+import zipfile
 from fastapi.testclient import TestClient
 import sys
 from pathlib import Path
@@ -10,7 +12,7 @@ from pathlib import Path
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 
-from api import app
+from api import app, count_files
 
 client = TestClient(app)
 
@@ -45,6 +47,18 @@ def test_invalid_session_query():
     assert response.status_code == 404
 
 
+def test_invalid_session_query_stream():
+    """Test streaming query with invalid session"""
+    response = client.post(
+        "/query/stream",
+        json={
+            "session_id": "invalid-session-id",
+            "query": "test query"
+        }
+    )
+    assert response.status_code == 404
+
+
 def test_invalid_github_url():
     """Test upload with invalid GitHub URL"""
     response = client.post(
@@ -55,5 +69,51 @@ def test_invalid_github_url():
     assert response.status_code in [400, 500]
 
 
+def test_upload_zip_skips_unsupported_files():
+    """Test ZIP upload only extracts supported file types"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as zf:
+        zf.writestr("project/main.py", "print('hello')\n")
+        zf.writestr("project/docs/README.md", "# Project\n")
+        zf.writestr("project/assets/logo.png", b"\x89PNG\r\n")
+    buffer.seek(0)
+
+    response = client.post(
+        "/upload/zip",
+        files={"file": ("project.zip", buffer, "application/zip")}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["files_count"] == 2
+    assert data["session_id"] in client.get("/sessions").json()["sessions"]
+
+    response = client.delete(f"/session/{data['session_id']}")
+    assert response.status_code == 200
+    assert data["session_id"] not in client.get("/sessions").json()["sessions"]
+
+
+def test_count_files_skips_hidden_and_ignored_dirs(tmp_path):
+    """Test the upload file count leaves out .git, dependencies and extensionless files"""
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "app.py").write_text("x = 1\n")
+    (tmp_path / "README.md").write_text("# Project\n")
+    (tmp_path / "Makefile").write_text("all:\n")
+    (tmp_path / ".git" / "objects").mkdir(parents=True)
+    (tmp_path / ".git" / "objects" / "pack.idx").write_bytes(b"")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "index.js").write_text("")
+
+    assert count_files(str(tmp_path)) == 2
+
+
+def test_upload_rejects_non_zip():
+    """Test upload with a non-ZIP file"""
+    response = client.post(
+        "/upload/zip",
+        files={"file": ("notes.txt", b"hello", "text/plain")}
+    )
+    assert response.status_code == 400
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,78 @@
+"""
+Tests for the code analyzer MCP server
+"""
+
+import pytest
+import sys
+from pathlib import Path
+from radon.raw import analyze
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mcp_servers.code_analyzer import CodeAnalyzerMCP, raw_metrics
+
+
+def issue_lines(issues):
+    """Reduce issues to (line, message) pairs"""
+    return [(issue['line'], issue['message']) for issue in issues]
+
+
+def test_detect_python_issues():
+    """Test every issue kind is reported on its own line, in order"""
+    content = (
+        "x = eval(data)\n"
+        "exec(code); y = eval(z)  # TODO: remove\n"
+        "PASSWORD = 'hunter2'\n"
+        "# FIXME\n"
+        + "a = 1" + " " * 120 + "\n"
+    )
+    assert issue_lines(CodeAnalyzerMCP()._detect_python_issues(content)) == [
+        (1, 'Use of eval() is dangerous'),
+        (2, 'Use of eval() is dangerous'),
+        (2, 'Use of exec() is dangerous'),
+        (2, 'TODO/FIXME comment found'),
+        (3, 'Hardcoded password detected'),
+        (4, 'TODO/FIXME comment found'),
+        (5, 'Line too long (125 characters)'),
+    ]
+
+
+def test_detect_python_issues_line_breaks():
+    """Test line numbers follow \\r and \\r\\n line breaks"""
+    content = "a = 1\r\nb = eval(c)\rd = 2\r\n# TODO\n\npassword\n= 'x'\n"
+    assert issue_lines(CodeAnalyzerMCP()._detect_python_issues(content)) == [
+        (2, 'Use of eval() is dangerous'),
+        (4, 'TODO/FIXME comment found'),
+    ]
+
+
+def test_detect_python_issues_clean_file():
+    """Test a file without issues reports none"""
+    assert CodeAnalyzerMCP()._detect_python_issues("def f():\n    return 1\n") == []
+
+
+RAW_METRICS_SOURCES = [
+    "",
+    "x = 1",
+    "x = 1\n\n\n",
+    "# only a comment\n",
+    'def f():\n    """\n    Multi-line\n\n    docstring\n    """\n    return 1\n',
+    'def f():\n    "One line"\n',
+    's = """\nnot a\n  docstring\n"""\n',
+    "x = (1,\n     # inside brackets\n     2)\n",
+    "total = 1 + \\\n    2\n",
+    "if a: b\nelse: c; d\n",
+    "try: x = [i for i in y]  # trailing\nexcept Exception:\n    pass\n",
+    "x = 1\r\n\r\ny = {\r\n  'k': 2,\r\n}\r\n",
+]
+
+
+@pytest.mark.parametrize("source", RAW_METRICS_SOURCES)
+def test_raw_metrics_matches_radon(source):
+    """Test the single-pass raw metrics agree with radon.raw.analyze"""
+    assert raw_metrics(source) == analyze(source)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
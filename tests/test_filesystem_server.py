@@ -0,0 +1,66 @@
+"""
+Tests for the filesystem MCP server
+"""
+
+import pytest
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mcp_servers.filesystem_server import FileSystemMCP
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """Small repository tree with a couple of source files"""
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "auth.py").write_text(
+        "def login(user):\n"
+        "    token = make_token(user)\n"
+        "    return token\n"
+    )
+    (tmp_path / "src" / "db.py").write_text(
+        "def connect():\n"
+        "    # TODO: pool connections\n"
+        "    return open_connection(url='sqlite://')\n"
+    )
+    return tmp_path
+
+
+def test_list_and_search_are_cached(repo, monkeypatch):
+    """Test repeated calls are served from the cache until it is cleared"""
+    fs = FileSystemMCP(str(repo))
+    scans = []
+    scan_files = fs._scan_files
+    monkeypatch.setattr(fs, "_scan_files", lambda pattern: scans.append(pattern) or scan_files(pattern))
+
+    assert len(fs.list_files("*.py")) == 2
+    assert len(fs.search_in_files("token")) == 2
+    assert len(fs.list_files("*.py")) == 2
+    assert len(fs.search_in_files("token")) == 2
+    assert scans == ["*.py"]
+
+    (repo / "src" / "api.py").write_text("token = None\n")
+    assert len(fs.search_in_files("token")) == 2
+
+    fs.clear_caches()
+    assert len(fs.list_files("*.py")) == 3
+    assert len(fs.search_in_files("token")) == 3
+    assert scans == ["*.py", "*.py"]
+
+
+@pytest.mark.parametrize("query", ["token", "make_token(user)", "url='", " = ", "@", "İ"])
+def test_index_search_matches_full_scan(repo, query):
+    """Test searching through the token index gives the same hits as a full scan"""
+    expected = FileSystemMCP(str(repo)).search_in_files(query)
+
+    fs = FileSystemMCP(str(repo))
+    fs.build_index()
+    assert fs._index is not None
+    assert fs.search_in_files(query) == expected
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])